@@ -7,6 +7,7 @@ import re
 import calendar
 from datetime import datetime, timedelta
 from pathlib import Path
+from project_config import get_todo_files, load_todo_tasks
 
 
 def parse_date_expr(expr, base_year=None):
@@ -56,6 +57,28 @@ def parse_date_expr(expr, base_year=None):
     return None
 
 
+def parse_time_expr(expr):
+    """日付の後ろの時刻表現を解析して (時, 分) を返す。解析できなければNone。
+
+    対応フォーマット:
+      - H:MM             (例: 11:00)
+      - H:MM~H:MM        (例: 11:00~11:45 → 開始時刻 11:00)
+      - 昼 / 正午         (→ 12:00)
+    """
+    expr = expr.strip()
+
+    m = re.match(r'^(\d{1,2})[:：](\d{2})', expr)
+    if m:
+        hour, minute = int(m.group(1)), int(m.group(2))
+        if hour < 24 and minute < 60:
+            return hour, minute
+
+    if expr.startswith('昼') or expr.startswith('正午'):
+        return 12, 0
+
+    return None
+
+
 def parse_todo_file(file_path):
     """TODO.mdファイルを解析してタスクを抽出"""
     with open(file_path, 'r', encoding='utf-8') as f:
@@ -68,10 +91,19 @@ def parse_todo_file(file_path):
     pattern = r'- \[[ \-]\] (.+?)[（\(]((?:締切|期限|予定)[：:]\s*)?(.+?)[）\)]'
 
     tasks = []
+    parent_title = None
     for line in content.split('\n'):
         # HTMLコメント内の例を無視
         if '<!--' in line:
             continue
+
+        # 親タスク（= Issueのタイトル）を記録
+        top = re.match(r'^- \[[ \-xX]\] (.+)$', line.rstrip())
+        if top:
+            parent_title = top.group(1).strip()
+        elif line.startswith('#'):
+            parent_title = None
+
         m = re.search(pattern, line)
         if not m:
             continue
@@ -80,13 +112,16 @@ def parse_todo_file(file_path):
         date_raw = m.group(3).strip()
 
         # 日付部分の後ろにある余計なテキスト（昼、正午、企業オリジナル等）を除去
-        date_clean = re.split(r'\s+', date_raw)[0]
+        parts = re.split(r'\s+', date_raw, maxsplit=1)
+        date_clean = parts[0]
 
         deadline = parse_date_expr(date_clean, base_year)
         if deadline:
             tasks.append({
                 'name': task_name,
                 'deadline': deadline,
+                'time': parse_time_expr(parts[1]) if len(parts) > 1 else None,
+                'issue_title': parent_title,
             })
 
     return tasks
@@ -115,16 +150,16 @@ def main():
     # TODO.mdのパスを取得
     script_dir = Path(__file__).parent
     repo_dir = script_dir.parent
-    todo_file = repo_dir / 'TODO.md'
+    todo_files = get_todo_files(repo_dir)
 
-    if not todo_file.exists():
-        print(f"❌ TODO.mdが見つかりません: {todo_file}")
+    if not todo_files:
+        print(f"❌ TODO.md / TODO.d/*.md が見つかりません: {repo_dir}")
         return
 
     print("📅 期限チェック")
     print("=" * 60)
 
-    tasks = parse_todo_file(todo_file)
+    tasks = load_todo_tasks(repo_dir, parse_todo_file, todo_files)
 
     if not tasks:
         print("期限付きのタスクが見つかりませんでした。")
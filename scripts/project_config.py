@@ -2,8 +2,15 @@
 GitHub Projects V2 の設定と共通ユーティリティ
 """
 
+import re
 import subprocess
 import json
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
 
 # プロジェクト設定
 PROJECT_NUMBER = 1
@@ -14,6 +21,13 @@ STATUS_OPTIONS = {
     "Done":        "98236657",
 }
 
+# タスクファイル: TODO.md + TODO.d/*.md（カテゴリ・プロジェクトごとの分割ファイル）
+TODO_FILE = 'TODO.md'
+TODO_DIR = 'TODO.d'
+PARSE_CACHE_FILE = '.todo_parse_cache.pickle'
+# 解析結果（タスク・ノードの形）を変えたら上げる
+PARSE_CACHE_VERSION = 1
+
 
 def get_project_owner():
     """gh認証済みユーザー名を取得"""
@@ -64,9 +78,13 @@ def get_project_id():
     return None
 
 
-def update_project_item_status(item_id, status_name):
-    """Projectアイテムのステータスを変更"""
-    project_id = get_project_id()
+def update_project_item_status(item_id, status_name, project_id=None):
+    """Projectアイテムのステータスを変更
+
+    project_id を渡せば Project ID の解決（API 2回）を省略できる。
+    """
+    if project_id is None:
+        project_id = get_project_id()
     if not project_id:
         return False
 
@@ -89,6 +107,160 @@ def update_project_item_status(item_id, status_name):
         return False
 
 
+def new_task_node(text, mark, line=None):
+    """タスクツリーのノードを作成
+
+    children: 子ノード（インデントで入れ子になったチェックボックス）
+    parent:   親ノード（トップレベルはNone）
+    progress: rollup_progress() が計算する進捗
+    """
+    return {
+        'text': text,
+        'completed': mark == 'x',
+        'in_progress': mark == '-',
+        'line': line,
+        'children': [],
+        'parent': None,
+    }
+
+
+def add_child(parent, child):
+    child['parent'] = parent
+    parent['children'].append(child)
+
+
+def _compute_progress(node):
+    """子ノードの計算済み進捗からこのノードの進捗を求める
+
+    done/total: 葉タスクの完了数/総数
+    ratio:      子ノードを同じ重みで平均した達成率（段階ごとの重み付け）
+    active:     配下に [-] のノードがあるか
+    """
+    children = node['children']
+    if not children:
+        done = 1 if node['completed'] else 0
+        return {
+            'done': done, 'total': 1, 'ratio': float(done),
+            'active': node['in_progress'],
+        }
+
+    total = sum(c['progress']['total'] for c in children)
+    if node['completed']:
+        # 親が明示的に [x] なら配下もすべて完了扱い
+        return {'done': total, 'total': total, 'ratio': 1.0, 'active': False}
+
+    return {
+        'done': sum(c['progress']['done'] for c in children),
+        'total': total,
+        'ratio': sum(c['progress']['ratio'] for c in children) / len(children),
+        'active': node['in_progress'] or any(c['progress']['active'] for c in children),
+    }
+
+
+def rollup_progress(node):
+    """ツリー全体の進捗をボトムアップで計算"""
+    for child in node['children']:
+        rollup_progress(child)
+    node['progress'] = _compute_progress(node)
+    return node['progress']
+
+
+def update_node_state(node, completed, in_progress=False):
+    """1ノードの状態を変更し、そのノードと祖先の進捗だけを再計算"""
+    node['completed'] = completed
+    node['in_progress'] = in_progress
+    while node is not None:
+        node['progress'] = _compute_progress(node)
+        node = node['parent']
+
+
+def format_progress(node):
+    """進捗を「3/5 (60%)」の形式で返す。子がなければ空文字"""
+    if not node['children']:
+        return ''
+    progress = node.get('progress') or rollup_progress(node)
+    return f"{progress['done']}/{progress['total']} ({round(progress['ratio'] * 100)}%)"
+
+
+def parse_todo_file(file_path):
+    """TODO.mdファイルを解析（[ ], [-], [x] 対応）
+
+    インデントの深さに応じてサブタスクをツリーとして保持する（children）。
+    subtasks には配下の全階層のノードを文書順に平坦化して入れる。
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    tasks = []
+    current_category = None
+    current_subsection = None
+    current_status = "todo"
+    current_parent = None
+    stack = []  # (インデント, ノード) 現在の祖先
+
+    for line_no, line in enumerate(content.split('\n')):
+        stripped = line.strip()
+
+        cat_match = re.match(r'^## (.+)$', stripped)
+        if cat_match:
+            current_category = cat_match.group(1)
+            current_subsection = None
+            current_status = "todo"
+            current_parent = None
+            continue
+
+        sub_match = re.match(r'^### (.+)$', stripped)
+        if sub_match:
+            subsection = sub_match.group(1)
+            current_subsection = subsection
+            if '進行中' in subsection or 'progress' in subsection.lower():
+                current_status = "in_progress"
+            elif '完了' in subsection or 'done' in subsection.lower():
+                current_status = "done"
+            else:
+                current_status = "todo"
+            current_parent = None
+            continue
+
+        indent = len(line) - len(line.lstrip())
+
+        # 3種類のチェックボックスを検出: [ ], [-], [x]
+        checkbox_match = re.match(r'^- \[([ \-x])\] (.+)$', stripped)
+        if not checkbox_match or not current_category:
+            # ヘッダー等でparentリセットしない（空行は無視）
+            continue
+
+        mark = checkbox_match.group(1)
+        task_text = checkbox_match.group(2).strip()
+
+        if indent == 0:
+            # トップレベル = 親タスク（Issueになる）
+            task = new_task_node(task_text, mark, line_no)
+            task.update({
+                'title': task_text,
+                'category': current_category,
+                'subsection': current_subsection,
+                'status': current_status,
+                'subtasks': [],
+            })
+            tasks.append(task)
+            current_parent = task
+            stack = [(0, task)]
+        elif indent >= 2 and current_parent is not None:
+            # サブタスク（直前の浅いインデントのノードの子）
+            while len(stack) > 1 and stack[-1][0] >= indent:
+                stack.pop()
+            node = new_task_node(task_text, mark, line_no)
+            add_child(stack[-1][1], node)
+            current_parent['subtasks'].append(node)
+            stack.append((indent, node))
+
+    for task in tasks:
+        rollup_progress(task)
+
+    return tasks
+
+
 def derive_project_status(task):
     """タスクのチェック状態からProjectステータスを決定
 
@@ -98,7 +270,7 @@ def derive_project_status(task):
       - [x]  完了 (Done)
 
     親タスクが [-] なら強制的に In Progress。
-    サブタスクがある場合は完了数から自動判定。
+    サブタスクがある場合は配下すべての階層の進捗から自動判定。
     """
     # 親が完了
     if task.get('completed'):
@@ -108,37 +280,157 @@ def derive_project_status(task):
     if task.get('in_progress'):
         return "In Progress"
 
-    subtasks = task.get('subtasks', [])
-    if not subtasks:
+    if not task.get('children'):
         return "Todo"
 
-    done_count = sum(1 for s in subtasks if s['completed'])
-    if done_count == len(subtasks):
+    progress = task.get('progress') or rollup_progress(task)
+    if progress['done'] == progress['total']:
         return "Done"
-    elif done_count > 0:
+    elif progress['done'] > 0 or progress['active']:
         return "In Progress"
     else:
         return "Todo"
 
 
-def git_commit_todo(repo_dir, message):
-    """TODO.mdの変更をgit commit"""
-    todo_path = str(repo_dir / 'TODO.md')
+def get_todo_files(repo_dir):
+    """論理的に1つのTODOを構成するファイル一覧（TODO.md → TODO.d/*.md の順）"""
+    repo_dir = Path(repo_dir)
+    files = []
+    if (repo_dir / TODO_FILE).is_file():
+        files.append(repo_dir / TODO_FILE)
+    todo_dir = repo_dir / TODO_DIR
+    if todo_dir.is_dir():
+        files.extend(sorted(p for p in todo_dir.glob('*.md') if p.is_file()))
+    return files
+
+
+def _parser_key(parse_func):
+    """解析関数の識別子（スクリプト直接実行時の __main__ でも区別できるようファイル名で）
+
+    解析関数のファイルに加え、ノードを組み立てるこのモジュールの更新日時と
+    キャッシュ形式のバージョンも含め、どちらかが変われば再解析させる。
+    年の省略された日付（3/5 など）は解析時の年で解釈されるため、年も含める。
+    """
+    source = Path(parse_func.__code__.co_filename)
+    shared = Path(__file__)
+    return (f"v{PARSE_CACHE_VERSION}:{source.name}:{parse_func.__name__}:"
+            f"{source.stat().st_mtime_ns}:{shared.stat().st_mtime_ns}:{datetime.now().year}")
+
+
+def _load_parse_cache(cache_path):
+    """解析キャッシュを読み込む。読めない・壊れている場合は空（全件キャッシュミス）"""
+    try:
+        with open(cache_path, 'rb') as f:
+            cache = pickle.load(f)
+    except Exception:
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _save_parse_cache(cache_path, cache):
+    """解析キャッシュを書き出す。失敗してもキャッシュが使えないだけなので無視する
+
+    常駐の todo-remind と todo-pull などが同時に書いても衝突しないよう、
+    一時ファイルはプロセスごとに別名で作ってから置き換える。
+    """
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(cache_path), prefix=f"{os.path.basename(cache_path)}.", suffix='.tmp'
+        )
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(cache, f)
+        os.replace(tmp_path, cache_path)
+        return True
+    except (OSError, pickle.PicklingError):
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def load_todo_tasks(repo_dir, parse_func, files=None):
+    """全タスクファイルを解析して1つのタスクリストにまとめる
+
+    - ファイルごとの解析結果を (mtime, サイズ) をキーにキャッシュ
+    - キャッシュにないファイルが複数あればプロセスプールで並列に解析
+    - 各タスクには元ファイルのパスを 'file' として付与
+    """
+    repo_dir = Path(repo_dir)
+    if files is None:
+        files = get_todo_files(repo_dir)
+
+    cache_path = repo_dir / PARSE_CACHE_FILE
+    cache = _load_parse_cache(cache_path)
+    parser = _parser_key(parse_func)
+
+    results = {}
+    misses = []
+    for path in files:
+        st = path.stat()
+        signature = (st.st_mtime_ns, st.st_size)
+        cached = cache.get((parser, str(path)))
+        if isinstance(cached, tuple) and len(cached) == 2 and cached[0] == signature:
+            results[path] = cached[1]
+        else:
+            misses.append((path, signature))
+
+    if len(misses) > 1:
+        with ProcessPoolExecutor(max_workers=min(len(misses), os.cpu_count() or 1)) as pool:
+            parsed = list(pool.map(parse_func, [path for path, _ in misses]))
+    else:
+        parsed = [parse_func(path) for path, _ in misses]
+
+    for (path, signature), tasks in zip(misses, parsed):
+        results[path] = tasks
+        cache[(parser, str(path))] = (signature, tasks)
+
+    if misses:
+        # 削除されたファイルのエントリは捨てる
+        existing = {str(p) for p in files}
+        cache = {k: v for k, v in cache.items() if k[0] != parser or k[1] in existing}
+        _save_parse_cache(cache_path, cache)
+
+    tasks = []
+    for path in files:
+        for task in results[path]:
+            task['file'] = str(path)
+            tasks.append(task)
+    return tasks
+
+
+def git_commit_todo(repo_dir, message, paths=None):
+    """タスクファイルの変更をgit commit
+
+    paths を指定すればそのファイルだけをステージする（既定: 全タスクファイル）。
+    """
+    if paths is None:
+        paths = get_todo_files(repo_dir)
+    todo_paths = [str(p) for p in paths]
+    if not todo_paths:
+        return False
 
     # 変更があるか確認
     result = subprocess.run(
-        ['git', 'diff', '--name-only', todo_path],
+        ['git', 'diff', '--name-only', '--'] + todo_paths,
+        capture_output=True, text=True, cwd=str(repo_dir)
+    )
+    untracked = subprocess.run(
+        ['git', 'ls-files', '--others', '--exclude-standard', '--'] + todo_paths,
         capture_output=True, text=True, cwd=str(repo_dir)
     )
-    if not result.stdout.strip():
+    if not result.stdout.strip() and not untracked.stdout.strip():
         return False
 
     subprocess.run(
-        ['git', 'add', todo_path],
+        ['git', 'add', '--'] + todo_paths,
         capture_output=True, text=True, cwd=str(repo_dir)
     )
     subprocess.run(
-        ['git', 'commit', '-m', message],
+        ['git', 'commit', '-m', message, '--'] + todo_paths,
         capture_output=True, text=True, cwd=str(repo_dir)
     )
     print(f"\n📦 git commit: {message}")
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+期限付きタスクのリマインダーを常駐して通知するスケジューラ
+
+- TODO.mdの日付（時刻付き 4/15 11:00~11:45 なども）からリマインダーを登録
+- 設定したリード時間（例: 1日前・1時間前・10分前）に通知
+- 通知先は stdout / デスクトップ通知 / Issueコメント から選択
+- TODO.md / TODO.d/*.md の変更時は差分だけ登録・取り消し（毎分の全件再走査はしない）
+"""
+
+import argparse
+import heapq
+import json
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from check_deadlines import parse_todo_file
+from project_config import get_todo_files, load_todo_tasks
+
+# 時刻のない日付はこの時刻を期限として扱う
+DEFAULT_DUE_TIME = (9, 0)
+DEFAULT_LEADS = ['1d', '1h', '10m']
+POLL_INTERVAL = 5.0
+ISSUE_STUB_FILE = '.reminder_comments.jsonl'
+DESKTOP_NOTIFY_SCRIPT = (
+    'on run argv\n'
+    '  display notification (item 1 of argv) with title (item 2 of argv)\n'
+    'end run'
+)
+
+
+def parse_lead(expr):
+    """リード時間の表現（30s, 10m, 1h, 1d）をtimedeltaに変換"""
+    m = re.match(r'^(\d+)([smhd])$', expr.strip())
+    if not m:
+        raise argparse.ArgumentTypeError(f"リード時間の形式が不正です: {expr}（例: 1d, 1h, 10m）")
+    value = int(m.group(1))
+    unit = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}[m.group(2)]
+    return timedelta(**{unit: value})
+
+
+def format_lead(lead):
+    seconds = int(lead.total_seconds())
+    if seconds % 86400 == 0:
+        return f"{seconds // 86400}日前"
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}時間前"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}分前"
+    return f"{seconds}秒前"
+
+
+def task_due(task):
+    """タスクの期限日時（時刻がなければ DEFAULT_DUE_TIME）"""
+    hour, minute = task.get('time') or DEFAULT_DUE_TIME
+    return task['deadline'].replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+def task_key(task):
+    """リマインダーの同一性判定用キー（名前・期限・親タスクが同じなら同一）"""
+    return (task['name'], task_due(task).isoformat(), task.get('issue_title'))
+
+
+# --- 通知先 ---------------------------------------------------------------
+
+def stdout_sink(reminder):
+    print(f"⏰ [{reminder['lead_label']}] {reminder['name']}"
+          f"（期限: {reminder['due'].strftime('%Y-%m-%d %H:%M')}）", flush=True)
+
+
+def desktop_sink(reminder):
+    """デスクトップ通知（macOS: osascript / Linux: notify-send）"""
+    title = f"タスク期限 {reminder['lead_label']}"
+    message = f"{reminder['name']}（{reminder['due'].strftime('%m/%d %H:%M')}）"
+    if sys.platform == 'darwin':
+        # 文字列はスクリプトに埋め込まず引数で渡す（日本語・引用符のエスケープ不要）
+        cmd = ['osascript', '-e', DESKTOP_NOTIFY_SCRIPT, message, title]
+    else:
+        cmd = ['notify-send', title, message]
+    try:
+        subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"⚠️  デスクトップ通知に失敗: {e}")
+
+
+def build_comment(reminder):
+    return (f"⏰ リマインダー（{reminder['lead_label']}）: {reminder['name']}\n\n"
+            f"期限: {reminder['due'].strftime('%Y-%m-%d %H:%M')}")
+
+
+def make_issue_stub_sink(stub_path):
+    """Issueコメントの代わりにローカルファイルへ書き出す（動作確認用）"""
+    def sink(reminder):
+        record = {
+            'issue_title': reminder['issue_title'],
+            'body': build_comment(reminder),
+            'fired_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        with open(stub_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    return sink
+
+
+def find_issue_number(title):
+    """タイトルが完全一致するopen Issueの番号を取得"""
+    try:
+        result = subprocess.run(
+            ['gh', 'issue', 'list', '--state', 'open', '--search', f'{title} in:title',
+             '--json', 'number,title', '--limit', '20'],
+            capture_output=True, text=True, check=True
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"⚠️  Issue検索に失敗: {e.stderr}")
+        return None
+    for issue in json.loads(result.stdout):
+        if issue['title'] == title:
+            return issue['number']
+    return None
+
+
+def issue_comment_sink(reminder):
+    """親タスクのIssueにコメントを投稿"""
+    title = reminder['issue_title']
+    number = find_issue_number(title) if title else None
+    if not number:
+        print(f"⚠️  Issueが見つからないためコメントをスキップ: {reminder['name']}")
+        return
+    try:
+        subprocess.run(
+            ['gh', 'issue', 'comment', str(number), '--body', build_comment(reminder)],
+            capture_output=True, text=True, check=True
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"⚠️  コメント投稿に失敗: #{number} - {e.stderr}")
+
+
+# --- スケジューラ ---------------------------------------------------------
+
+class ReminderScheduler:
+    """リマインダーを発火時刻順のヒープで管理する
+
+    取り消しはヒープから削除せず、世代番号の不一致で発火時に読み飛ばす。
+    """
+
+    def __init__(self, leads, sinks):
+        self.leads = sorted(leads, reverse=True)
+        self.sinks = sinks
+        self._heap = []
+        self._seq = 0
+        self._active = {}  # task_key -> 世代番号
+
+    def add_task(self, task, now):
+        key = task_key(task)
+        self._seq += 1
+        generation = self._seq
+        self._active[key] = generation
+
+        due = task_due(task)
+        for lead in self.leads:
+            fire_at = due - lead
+            if fire_at < now:
+                continue
+            reminder = {
+                'name': task['name'],
+                'issue_title': task.get('issue_title'),
+                'due': due,
+                'lead_label': format_lead(lead),
+            }
+            heapq.heappush(self._heap, (fire_at, self._seq, key, generation, reminder))
+            self._seq += 1
+
+    def remove_task(self, key):
+        self._active.pop(key, None)
+
+    def sync_tasks(self, tasks, now):
+        """現在のタスク一覧との差分だけ登録・取り消しし、(追加, 削除) 件数を返す"""
+        current = {task_key(t): t for t in tasks}
+        removed = [k for k in self._active if k not in current]
+        added = [t for k, t in current.items() if k not in self._active]
+        for key in removed:
+            self.remove_task(key)
+        for task in added:
+            self.add_task(task, now)
+        return len(added), len(removed)
+
+    def next_fire_time(self):
+        self._discard_cancelled()
+        return self._heap[0][0] if self._heap else None
+
+    def fire_due(self, now):
+        """発火時刻を過ぎたリマインダーを通知し、件数を返す"""
+        fired = 0
+        while True:
+            self._discard_cancelled()
+            if not self._heap or self._heap[0][0] > now:
+                return fired
+            _, _, _, _, reminder = heapq.heappop(self._heap)
+            for sink in self.sinks:
+                # 1つの通知先の失敗で常駐プロセスや他の通知を止めない
+                try:
+                    sink(reminder)
+                except Exception as e:
+                    name = getattr(sink, '__name__', repr(sink))
+                    print(f"⚠️  通知に失敗: {name} - {reminder['name']} - {e}", flush=True)
+            fired += 1
+
+    def _discard_cancelled(self):
+        while self._heap:
+            _, _, key, generation, _ = self._heap[0]
+            if self._active.get(key) == generation:
+                return
+            heapq.heappop(self._heap)
+
+
+def files_signature(paths):
+    """タスクファイル群の (パス, mtime, サイズ) 一覧。ファイルの追加・削除も検知できる"""
+    signature = []
+    for path in paths:
+        st = path.stat()
+        signature.append((str(path), st.st_mtime_ns, st.st_size))
+    return signature
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="期限付きタスクのリマインダーを常駐して通知")
+    parser.add_argument('--lead', action='append', type=parse_lead, metavar='TIME',
+                        help=f"通知するリード時間（複数指定可、既定: {' '.join(DEFAULT_LEADS)}）")
+    parser.add_argument('--sink', action='append', choices=['stdout', 'desktop', 'issue', 'issue-stub'],
+                        help="通知先（複数指定可、既定: stdout）。issue-stub は"
+                             f" {ISSUE_STUB_FILE} にコメント内容を書き出す")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    script_dir = Path(__file__).parent
+    repo_dir = script_dir.parent
+    if not get_todo_files(repo_dir):
+        print(f"❌ TODO.md / TODO.d/*.md が見つかりません: {repo_dir}")
+        return
+
+    leads = args.lead or [parse_lead(x) for x in DEFAULT_LEADS]
+    sink_map = {
+        'stdout': stdout_sink,
+        'desktop': desktop_sink,
+        'issue': issue_comment_sink,
+        'issue-stub': make_issue_stub_sink(repo_dir / ISSUE_STUB_FILE),
+    }
+    sinks = [sink_map[name] for name in (args.sink or ['stdout'])]
+
+    scheduler = ReminderScheduler(leads, sinks)
+
+    print("🔔 リマインダー")
+    print("=" * 60)
+    print(f"リード時間: {', '.join(format_lead(lead) for lead in scheduler.leads)}")
+
+    signature = None
+    try:
+        while True:
+            now = datetime.now()
+            todo_files = get_todo_files(repo_dir)
+            current = files_signature(todo_files)
+            if current != signature:
+                signature = current
+                # 変更のないファイルは解析キャッシュから読まれる
+                tasks = load_todo_tasks(repo_dir, parse_todo_file, todo_files)
+                added, removed = scheduler.sync_tasks(tasks, now)
+                if added or removed:
+                    print(f"🔄 TODO.md更新: +{added} / -{removed}", flush=True)
+
+            scheduler.fire_due(now)
+
+            next_fire = scheduler.next_fire_time()
+            wait = POLL_INTERVAL
+            if next_fire:
+                wait = min(wait, max(0.0, (next_fire - datetime.now()).total_seconds()))
+            time.sleep(wait)
+    except KeyboardInterrupt:
+        print("\n👋 終了")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,19 +8,40 @@ GitHub Issues + Project → TODO.md への同期（pull）
 - 変更後に git commit + push
 """
 
+import argparse
 import re
 import subprocess
 import json
 from pathlib import Path
-from project_config import get_project_items, git_commit_todo
+from project_config import (
+    get_project_items, git_commit_todo, update_node_state, format_progress,
+    get_todo_files, load_todo_tasks, parse_todo_file
+)
+from sync_plan import make_plan, print_plan, save_plan, load_plan, warn_if_stale
+
+
+ISSUE_CACHE_FILE = '.issue_cache.json'
+DEFAULT_PLAN_FILE = 'pull.plan.json'
+ISSUE_BODY_BATCH_SIZE = 50
+ISSUE_BODIES_QUERY = """
+query($owner: String!, $repo: String!) {
+  repository(owner: $owner, name: $repo) {
+%s
+  }
+}
+"""
 
 
 def get_issues():
-    """GitHub Issuesを全件取得（open + closed）"""
+    """GitHub Issuesを全件取得（open + closed）
+
+    本文は取得せず、一覧に必要な最小限のフィールドのみ取得する。
+    本文は prefetch_issue_bodies() でサブタスクを持つタスクの分だけまとめて取得。
+    """
     try:
         result = subprocess.run(
             ['gh', 'issue', 'list', '--state', 'all',
-             '--json', 'number,title,body,state', '--limit', '200'],
+             '--json', 'number,title,state,updatedAt', '--limit', '200'],
             capture_output=True, text=True, check=True
         )
         return json.loads(result.stdout)
@@ -29,37 +50,259 @@ def get_issues():
         return []
 
 
+def get_issue_bodies(issue_numbers):
+    """複数のIssue本文をGraphQLでまとめて取得（ISSUE_BODY_BATCH_SIZE件ごとに1リクエスト）
+
+    戻り値: {番号: 本文}。取得に失敗したIssueは含まれない。
+    """
+    bodies = {}
+    numbers = list(issue_numbers)
+    for start in range(0, len(numbers), ISSUE_BODY_BATCH_SIZE):
+        batch = numbers[start:start + ISSUE_BODY_BATCH_SIZE]
+        fields = "\n".join(f"    i{n}: issue(number: {int(n)}) {{ body }}" for n in batch)
+        try:
+            result = subprocess.run(
+                ['gh', 'api', 'graphql',
+                 '-f', f'query={ISSUE_BODIES_QUERY % fields}',
+                 '-F', 'owner={owner}', '-F', 'repo={repo}'],
+                capture_output=True, text=True, check=True
+            )
+            repository = json.loads(result.stdout)['data']['repository']
+        except (subprocess.CalledProcessError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️  Issue本文の取得に失敗: {len(batch)}件 - {getattr(e, 'stderr', e)}")
+            continue
+        for n in batch:
+            node = repository.get(f"i{n}")
+            if node is not None:
+                bodies[n] = node.get('body') or ''
+    return bodies
+
+
+def prefetch_issue_bodies(issues, titles, cache=None):
+    """titles に該当し、キャッシュが古いIssueの本文だけを一括取得して issue['body'] に入れる
+
+    チェックリストの解析は get_issue_subtasks() での初回アクセスまで遅延する。
+    """
+    missing = {}
+    for issue in issues:
+        if issue['title'] not in titles or 'subtasks' in issue or 'body' in issue:
+            continue
+        cached = (cache or {}).get(str(issue['number']))
+        updated_at = issue.get('updatedAt')
+        if cached and updated_at and cached.get('updatedAt') == updated_at:
+            continue
+        missing[issue['number']] = issue
+
+    if not missing:
+        return 0
+
+    bodies = get_issue_bodies(missing)
+    for number, body in bodies.items():
+        missing[number]['body'] = body
+    return len(bodies)
+
+
+def titles_with_subtasks(lines):
+    """サブタスク行を持つトップレベルタスクのタイトル集合（本文の取得が必要なもの）"""
+    titles = set()
+    current_title = None
+    for line in lines:
+        stripped = line.strip()
+        indent = len(line) - len(line.lstrip())
+        match = re.match(r'^- \[([ \-x])\] (.+)$', stripped)
+        if match and indent == 0:
+            current_title = match.group(2).strip()
+        elif match and indent >= 2 and current_title:
+            titles.add(current_title)
+        elif stripped.startswith('#'):
+            current_title = None
+    return titles
+
+
+def load_issue_cache(cache_path):
+    """前回pull時のIssueチェックリストのキャッシュを読み込む
+
+    形式: {"<number>": {"updatedAt": "...", "subtasks": [[[祖先..., text], completed], ...]}}
+    読み込み後の subtasks は {(祖先..., text): completed}
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    cache = {}
+    for key, entry in data.items():
+        subtasks = entry.get('subtasks') if isinstance(entry, dict) else None
+        if not isinstance(subtasks, list):
+            # 旧形式（テキストのみがキー）のエントリは破棄して取り直す
+            continue
+        cache[key] = {
+            'updatedAt': entry.get('updatedAt'),
+            'subtasks': {tuple(path): completed for path, completed in subtasks},
+        }
+    return cache
+
+
+def save_issue_cache(cache_path, cache):
+    """JSONはタプルをキーにできないため、subtasks は [パス, 完了] のリストで保存"""
+    data = {
+        key: {
+            'updatedAt': entry['updatedAt'],
+            'subtasks': [[list(path), completed] for path, completed in entry['subtasks'].items()],
+        }
+        for key, entry in cache.items()
+    }
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
 def parse_issue_checkboxes(body):
-    """Issue本文からチェックリストを解析"""
+    """Issue本文からチェックリストを解析
+
+    入れ子のチェックリストに対応し、ルートからのテキストの並び（タプル）をキーにする。
+    例: {('一次選考', '面接'): False, ('二次選考', '面接'): True}
+    """
     subtasks = {}
     if not body:
         return subtasks
 
+    stack = []  # (インデント, テキスト) 現在の祖先
     for line in body.split('\n'):
-        match = re.match(r'^- \[([ x])\] (.+)$', line.strip())
-        if match:
-            completed = match.group(1) == 'x'
-            text = match.group(2).strip()
-            subtasks[text] = completed
+        stripped = line.strip()
+        if stripped.startswith('#'):
+            stack = []
+            continue
+        match = re.match(r'^- \[([ x])\] (.+)$', stripped)
+        if not match:
+            continue
+        indent = len(line) - len(line.lstrip())
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        text = match.group(2).strip()
+        path = tuple(t for _, t in stack) + (text,)
+        subtasks[path] = match.group(1) == 'x'
+        stack.append((indent, text))
 
     return subtasks
 
 
-def update_todo_file(todo_path, issues, project_status_map):
-    """todo.mdをGitHub Issue + Projectの状態で更新"""
-    with open(todo_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    issue_map = {}
-    for issue in issues:
-        issue_map[issue['title']] = {
-            'state': issue['state'],
-            'subtasks': parse_issue_checkboxes(issue.get('body', '')),
-        }
-
+def get_issue_subtasks(issue, cache=None):
+    """Issueのチェックリストを初回アクセス時に解析して返す
+
+    - 既に解析済みならそれを返す
+    - 本文が取得済み（prefetch_issue_bodies など）ならそれを解析し、キャッシュを更新
+    - updatedAt がキャッシュと一致すれば本文を取得しない
+    - それ以外は本文を取得して解析し、キャッシュを更新
+    """
+    if 'subtasks' in issue:
+        return issue['subtasks']
+
+    key = str(issue.get('number'))
+    updated_at = issue.get('updatedAt')
+
+    if 'body' not in issue:
+        if cache is not None:
+            cached = cache.get(key)
+            if cached and updated_at and cached.get('updatedAt') == updated_at:
+                issue['subtasks'] = cached.get('subtasks', {})
+                return issue['subtasks']
+
+        body = get_issue_bodies([issue['number']]).get(issue['number'])
+        if body is None:
+            # 取得失敗時は何も変更しない（キャッシュも更新しない）
+            issue['subtasks'] = {}
+            return issue['subtasks']
+        issue['body'] = body
+
+    issue['subtasks'] = parse_issue_checkboxes(issue['body'])
+    if cache is not None and updated_at:
+        cache[key] = {'updatedAt': updated_at, 'subtasks': issue['subtasks']}
+    return issue['subtasks']
+
+
+def plan_pull(repo_dir, todo_files, issues, project_status_map, issue_cache=None):
+    """タスクファイルへの変更を行単位の操作リストとして計算する（ファイルは書き換えない）
+
+    各操作には repo_dir からの相対パスを 'file' として持たせる。
+    戻り値: (操作リスト, 変更内容のリスト)
+    """
+    issue_map = {issue['title']: issue for issue in issues}
+    file_lines = {}
+    for todo_path in todo_files:
+        with open(todo_path, 'r', encoding='utf-8') as f:
+            file_lines[todo_path] = f.readlines()
+
+    # 本文が必要なIssueを先に集めて一括取得（解析は初回アクセス時）
+    needed = set()
+    for lines in file_lines.values():
+        needed |= titles_with_subtasks(lines)
+    prefetch_issue_bodies(issues, needed, issue_cache)
+
+    operations = []
+    changes = []
+    for todo_path, lines in file_lines.items():
+        new_lines, file_changes = apply_issue_updates(
+            lines, issue_map, project_status_map, issue_cache
+        )
+        rel_path = str(Path(todo_path).relative_to(repo_dir))
+        # apply_issue_updates は変更した行ごとに1件ずつ、行順に変更内容を記録する
+        changed = [
+            (i, old, new) for i, (old, new) in enumerate(zip(lines, new_lines)) if old != new
+        ]
+        for (i, old, new), change in zip(changed, file_changes):
+            operations.append({
+                'op': 'update_line', 'file': rel_path, 'line': i,
+                'old': old, 'new': new, 'change': change,
+            })
+        changes.extend(file_changes)
+
+    return operations, changes
+
+
+def apply_pull_plan(repo_dir, operations):
+    """計画された行更新を適用し、適用した操作のリストを返す
+
+    変更のあるファイルだけを書き換え、計画時と内容が異なる行はスキップする。
+    """
+    ops_by_file = {}
+    for op in operations:
+        ops_by_file.setdefault(op['file'], []).append(op)
+
+    applied = []
+    for rel_path, file_ops in ops_by_file.items():
+        todo_path = Path(repo_dir) / rel_path
+        with open(todo_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+
+        file_applied = []
+        for op in file_ops:
+            i = op['line']
+            if i >= len(lines) or lines[i] != op['old']:
+                print(f"  ⚠️  {rel_path}:{i + 1} は計画作成後に変更されたためスキップ: {op['old'].strip()}")
+                continue
+            lines[i] = op['new']
+            file_applied.append(op)
+
+        if file_applied:
+            with open(todo_path, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+            applied.extend(file_applied)
+
+    return applied
+
+
+def apply_issue_updates(lines, issue_map, project_status_map, issue_cache=None):
+    """TODO.mdの各行にIssue + Projectの状態を反映する
+
+    issue_map に含まれるタイトルのタスク行だけが変更対象になるため、
+    1件分のIssueだけを渡せば対象タスクのみの差分更新になる。
+    戻り値: (更新後の行リスト, 変更内容のリスト)
+    """
     new_lines = []
     current_parent_title = None
     current_parent_issue = None
+    sub_stack = []  # (インデント, テキスト) 親タスク配下の現在の祖先
     changes = []
 
     for line in lines:
@@ -73,6 +316,7 @@ def update_todo_file(todo_path, issues, project_status_map):
             title = top_match.group(2).strip()
             current_parent_title = title
             current_parent_issue = issue_map.get(title)
+            sub_stack = []
 
             # 新しいマークを決定
             new_mark = old_mark
@@ -103,16 +347,22 @@ def update_todo_file(todo_path, issues, project_status_map):
         if sub_match and indent >= 2 and current_parent_issue:
             old_mark = sub_match.group(1)
             text = sub_match.group(2).strip()
-            issue_subtasks = current_parent_issue['subtasks']
+            issue_subtasks = get_issue_subtasks(current_parent_issue, issue_cache)
 
-            if text in issue_subtasks:
-                is_done = issue_subtasks[text]
+            # 同名のサブタスクが別の段階にもあるため、祖先のテキストの並びで照合
+            while sub_stack and sub_stack[-1][0] >= indent:
+                sub_stack.pop()
+            path = tuple(t for _, t in sub_stack) + (text,)
+            sub_stack.append((indent, text))
+
+            if path in issue_subtasks:
+                is_done = issue_subtasks[path]
                 new_mark = 'x' if is_done else ' '
 
                 if old_mark != new_mark:
                     line = line.replace(f'- [{old_mark}]', f'- [{new_mark}]', 1)
                     state_str = "done" if is_done else "todo"
-                    changes.append(f"  [{state_str}] {text}（{current_parent_title}）")
+                    changes.append(f"  [{state_str}] {' > '.join(path)}（{current_parent_title}）")
 
             new_lines.append(line)
             continue
@@ -126,14 +376,30 @@ def update_todo_file(todo_path, issues, project_status_map):
 
         new_lines.append(line)
 
-    with open(todo_path, 'w', encoding='utf-8') as f:
-        f.writelines(new_lines)
+    return new_lines, changes
+
+
+def update_task_tree(repo_dir, tasks, applied_operations):
+    """適用した行更新をタスクツリーに反映（変更ノードの祖先だけ進捗を再計算）"""
+    node_by_line = {}
+    for task in tasks:
+        for node in [task] + task['subtasks']:
+            node_by_line[(task['file'], node['line'])] = node
 
-    return changes
+    for op in applied_operations:
+        node = node_by_line.get((str(Path(repo_dir) / op['file']), op['line']))
+        match = re.match(r'^- \[([ \-x])\] ', op['new'].strip())
+        if node and match:
+            mark = match.group(1)
+            update_node_state(node, mark == 'x', mark == '-')
 
 
-def show_project_dashboard(project_items):
-    """ターミナルにProjectダッシュボードを表示"""
+def show_project_dashboard(project_items, progress_map=None):
+    """ターミナルにProjectダッシュボードを表示
+
+    progress_map: タイトル → サブタスク進捗の表示文字列（任意）
+    """
+    progress_map = progress_map or {}
     todo = []
     in_progress = []
     done = []
@@ -141,6 +407,8 @@ def show_project_dashboard(project_items):
     for item in project_items:
         status = item.get('status', 'Todo')
         title = item.get('title', '?')
+        if progress_map.get(title):
+            title = f"{title}  {progress_map[title]}"
         if status == 'Done':
             done.append(title)
         elif status == 'In Progress':
@@ -169,32 +437,72 @@ def show_project_dashboard(project_items):
     print()
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="GitHub Issues + Project → TODO.md への同期（pull）")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--plan', nargs='?', const=DEFAULT_PLAN_FILE, metavar='FILE',
+                       help=f"TODO.mdを変更せず計画を保存（既定: カレントディレクトリの {DEFAULT_PLAN_FILE}）")
+    group.add_argument('--apply', metavar='FILE',
+                       help="保存した計画を再取得なしで実行（相対パスはカレントディレクトリ基準）")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     script_dir = Path(__file__).parent
     repo_dir = script_dir.parent
-    todo_file = repo_dir / 'TODO.md'
+    todo_files = get_todo_files(repo_dir)
 
-    if not todo_file.exists():
-        print(f"❌ TODO.mdが見つかりません: {todo_file}")
+    if not todo_files:
+        print(f"❌ TODO.md / TODO.d/*.md が見つかりません: {repo_dir}")
         return
 
     print("⬇️  pull: GitHub Issues + Project → TODO.md + git")
     print("=" * 60)
 
-    issues = get_issues()
-    if not issues:
-        print("Issueが見つかりませんでした。")
-        return
-
-    open_count = sum(1 for i in issues if i['state'] == 'OPEN')
-    closed_count = sum(1 for i in issues if i['state'] == 'CLOSED')
-    print(f"📥 Issues: {len(issues)} 件（open: {open_count}, closed: {closed_count}）")
-
-    # Projectステータスを取得
-    project_items = get_project_items()
-    project_status_map = {item['title']: item.get('status', 'Todo') for item in project_items}
-
-    changes = update_todo_file(todo_file, issues, project_status_map)
+    project_items = None
+    if args.apply:
+        plan = load_plan(Path(args.apply), 'pull')
+        if not plan:
+            return
+        warn_if_stale(plan, todo_files)
+        operations = plan['operations']
+        print(f"📂 計画を実行: {args.apply}（{len(operations)} 操作）")
+        applied = apply_pull_plan(repo_dir, operations)
+    else:
+        issues = get_issues()
+        if not issues:
+            print("Issueが見つかりませんでした。")
+            return
+
+        open_count = sum(1 for i in issues if i['state'] == 'OPEN')
+        closed_count = sum(1 for i in issues if i['state'] == 'CLOSED')
+        print(f"📥 Issues: {len(issues)} 件（open: {open_count}, closed: {closed_count}）")
+
+        # Projectステータスを取得
+        project_items = get_project_items()
+        project_status_map = {item['title']: item.get('status', 'Todo') for item in project_items}
+
+        tasks = load_todo_tasks(repo_dir, parse_todo_file, todo_files)
+        cache_file = repo_dir / ISSUE_CACHE_FILE
+        issue_cache = load_issue_cache(cache_file)
+        operations, _ = plan_pull(repo_dir, todo_files, issues, project_status_map, issue_cache)
+        save_issue_cache(cache_file, issue_cache)
+
+        if args.plan:
+            plan = make_plan('pull', operations, todo_files)
+            print_plan(plan)
+            save_plan(plan, Path(args.plan))
+            return
+
+        applied = apply_pull_plan(repo_dir, operations)
+        update_task_tree(repo_dir, tasks, applied)
+
+    # 実際に適用できた操作だけを報告する（--apply で古くなった行はスキップ済み）
+    changes = [op.get('change') or op['new'].strip() for op in applied]
+    skipped = len(operations) - len(applied)
+    if skipped:
+        print(f"\n⚠️  {skipped} 箇所はスキップ")
 
     if changes:
         print("\n変更内容:")
@@ -203,7 +511,9 @@ def main():
         print(f"\n✨ {len(changes)} 箇所を更新")
 
         # git commit + push
-        git_commit_todo(repo_dir, "タスク同期: pull from GitHub")
+        # 変更したファイルだけをステージ
+        changed_files = sorted({repo_dir / op['file'] for op in applied})
+        git_commit_todo(repo_dir, "タスク同期: pull from GitHub", changed_files)
         subprocess.run(
             ['git', 'push'],
             capture_output=True, text=True, cwd=str(repo_dir)
@@ -211,7 +521,9 @@ def main():
     else:
         print("\n✅ TODO.mdは最新（変更なし）")
 
-    show_project_dashboard(project_items)
+    if project_items is not None:
+        progress_map = {t['title']: format_progress(t) for t in tasks}
+        show_project_dashboard(project_items, progress_map)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,130 @@
+"""
+push / pull の実行計画（plan）の作成・保存・表示
+
+--plan で変更内容を計算して保存し、--apply <plan> で再取得せずにそのまま実行する。
+"""
+
+import hashlib
+import json
+from datetime import datetime
+
+# 操作ごとのAPIコストの目安（gh CLIが内部で発行するリクエスト数）
+# GraphQLのポイントはクエリ1点、ミューテーション5点（セカンダリレート制限の換算）で計算
+API_COSTS = {
+    'create_issue':       {'requests': 3, 'graphql_points': 7},  # リポジトリ/ラベル照会 + createIssue
+    'update_issue':       {'requests': 2, 'graphql_points': 6},  # Issue照会 + updateIssue
+    'close_issue':        {'requests': 2, 'graphql_points': 6},  # Issue照会 + closeIssue
+    'set_project_status': {'requests': 1, 'graphql_points': 5},  # updateProjectV2ItemFieldValue
+    'update_line':        {'requests': 0, 'graphql_points': 0},  # TODO.mdのローカル編集のみ
+}
+
+# Projectステータス変更がある場合に1回だけ必要なProject ID解決
+# （gh api user: REST 1回 + gh project list: GraphQL 1回）
+PROJECT_LOOKUP_COST = {'requests': 2, 'graphql_points': 1}
+
+OPERATION_LABELS = {
+    'create_issue':       '🆕 Issue作成',
+    'update_issue':       '📝 Issue本文更新',
+    'close_issue':        '🎉 Issueクローズ',
+    'set_project_status': '📊 Projectステータス変更',
+    'update_line':        '✏️  TODO.md行更新',
+}
+
+
+def files_digest(paths):
+    """タスクファイル群の内容のSHA-256（plan作成後の変更検知用）"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def make_plan(kind, operations, todo_files):
+    return {
+        'kind': kind,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'todo_sha256': files_digest(todo_files),
+        'operations': operations,
+    }
+
+
+def estimate_cost(operations):
+    """操作リストから (リクエスト数, GraphQLポイント) の見積もりを返す"""
+    requests = 0
+    points = 0
+    for op in operations:
+        cost = API_COSTS.get(op['op'], {'requests': 0, 'graphql_points': 0})
+        requests += cost['requests']
+        points += cost['graphql_points']
+    if any(op['op'] == 'set_project_status' for op in operations):
+        requests += PROJECT_LOOKUP_COST['requests']
+        points += PROJECT_LOOKUP_COST['graphql_points']
+    return requests, points
+
+
+def describe_operation(op):
+    name = op['op']
+    if name == 'create_issue':
+        return op['title']
+    if name == 'set_project_status':
+        return f"#{op.get('number', '?')} {op['title']}: {op['from'] or '(なし)'} → {op['to']}"
+    if name == 'update_line':
+        return f"{op['file']}:{op['line'] + 1}: {op['new'].strip()}"
+    return f"#{op['number']} {op['title']}"
+
+
+def print_plan(plan):
+    """操作種別ごとにまとめて表示"""
+    operations = plan['operations']
+    print(f"\n📋 実行計画（{plan['kind']}）")
+    print("=" * 60)
+
+    if not operations:
+        print("\n✅ 変更なし")
+        return
+
+    for name, label in OPERATION_LABELS.items():
+        ops = [op for op in operations if op['op'] == name]
+        if not ops:
+            continue
+        print(f"\n{label} ({len(ops)})")
+        for op in ops:
+            print(f"  - {describe_operation(op)}")
+
+    requests, points = estimate_cost(operations)
+    print("\n" + "-" * 60)
+    print(f"💰 見積もり: APIリクエスト 約{requests}回 / GraphQL 約{points}ポイント")
+
+
+def save_plan(plan, plan_path):
+    with open(plan_path, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 計画を保存: {plan_path}")
+
+
+def load_plan(plan_path, kind):
+    """計画を読み込む。読み込めない・種別が違えばNone"""
+    try:
+        with open(plan_path, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ 計画ファイルが見つかりません: {plan_path}")
+        return None
+    except (OSError, ValueError) as e:
+        print(f"❌ 計画ファイルを読み込めません: {plan_path} - {e}")
+        return None
+    if not isinstance(plan, dict) or not isinstance(plan.get('operations'), list):
+        print(f"❌ 計画ファイルの形式が不正です: {plan_path}")
+        return None
+    if plan.get('kind') != kind:
+        print(f"❌ {kind} 用の計画ではありません: {plan_path}（{plan.get('kind')}）")
+        return None
+    return plan
+
+
+def warn_if_stale(plan, todo_files):
+    """plan作成後にタスクファイルが変更されていれば警告"""
+    if plan.get('todo_sha256') != files_digest(todo_files):
+        print("⚠️  計画の作成後にTODO.mdが変更されています（計画どおりに実行します）")
@@ -10,84 +10,18 @@ TODO.md → GitHub Issues + Project への同期（push）
 - 変更後に git commit + push
 """
 
-import re
+import argparse
 import subprocess
 import json
 from pathlib import Path
 from project_config import (
-    get_project_items, update_project_item_status,
-    derive_project_status, git_commit_todo
+    get_project_items, get_project_id, update_project_item_status,
+    derive_project_status, git_commit_todo, get_todo_files, load_todo_tasks,
+    parse_todo_file, format_progress
 )
+from sync_plan import make_plan, print_plan, save_plan, load_plan, warn_if_stale
 
-
-def parse_todo_file(file_path):
-    """TODO.mdファイルを解析（[ ], [-], [x] 対応）"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    tasks = []
-    current_category = None
-    current_subsection = None
-    current_status = "todo"
-    current_parent = None
-
-    for line in content.split('\n'):
-        stripped = line.strip()
-
-        cat_match = re.match(r'^## (.+)$', stripped)
-        if cat_match:
-            current_category = cat_match.group(1)
-            current_subsection = None
-            current_status = "todo"
-            current_parent = None
-            continue
-
-        sub_match = re.match(r'^### (.+)$', stripped)
-        if sub_match:
-            subsection = sub_match.group(1)
-            current_subsection = subsection
-            if '進行中' in subsection or 'progress' in subsection.lower():
-                current_status = "in_progress"
-            elif '完了' in subsection or 'done' in subsection.lower():
-                current_status = "done"
-            else:
-                current_status = "todo"
-            current_parent = None
-            continue
-
-        indent = len(line) - len(line.lstrip())
-
-        # 3種類のチェックボックスを検出: [ ], [-], [x]
-        checkbox_match = re.match(r'^- \[([ \-x])\] (.+)$', stripped)
-        if not checkbox_match or not current_category:
-            # ヘッダー等でparentリセットしない（空行は無視）
-            continue
-
-        mark = checkbox_match.group(1)
-        task_text = checkbox_match.group(2).strip()
-
-        if indent == 0:
-            # トップレベル = 親タスク（Issueになる）
-            task = {
-                'title': task_text,
-                'category': current_category,
-                'subsection': current_subsection,
-                'status': current_status,
-                'completed': mark == 'x',
-                'in_progress': mark == '-',
-                'subtasks': [],
-            }
-            tasks.append(task)
-            current_parent = task
-        elif indent >= 2 and current_parent is not None:
-            # サブタスク
-            current_parent['subtasks'].append({
-                'text': task_text,
-                'completed': mark == 'x',
-                'in_progress': mark == '-',
-            })
-
-    return tasks
+DEFAULT_PLAN_FILE = 'push.plan.json'
 
 
 def get_existing_issues():
@@ -142,16 +76,14 @@ def build_issue_body(task):
     lines.append(f"**カテゴリ:** {task['category']}")
     if task.get('subsection'):
         lines.append(f"**セクション:** {task['subsection']}")
+    if task['children']:
+        lines.append(f"**進捗:** {format_progress(task)}")
     lines.append("")
 
-    if task['subtasks']:
+    if task['children']:
         lines.append("## タスク一覧")
         lines.append("")
-        for sub in task['subtasks']:
-            if sub['completed']:
-                lines.append(f"- [x] {sub['text']}")
-            else:
-                lines.append(f"- [ ] {sub['text']}")
+        append_checklist(lines, task['children'], 0)
         lines.append("")
 
     lines.append("---")
@@ -159,18 +91,27 @@ def build_issue_body(task):
     return "\n".join(lines)
 
 
-def create_issue(task):
-    title = task['title']
-    body = build_issue_body(task)
-    labels = build_labels(task)
+def append_checklist(lines, nodes, depth):
+    """サブタスクツリーを入れ子のチェックリストとして書き出す"""
+    indent = '  ' * depth
+    for node in nodes:
+        mark = 'x' if node['completed'] else ' '
+        # pull時にTODO.mdの行と照合するため、テキストはTODO.mdと同一にする
+        lines.append(f"{indent}- [{mark}] {node['text']}")
+        append_checklist(lines, node['children'], depth + 1)
+
 
-    cmd = ['gh', 'issue', 'create', '--title', title, '--body', body]
-    if labels:
-        cmd.extend(['--label', ','.join(labels)])
+def create_issue(issue):
+    """Issueを作成（issue: title, body, labels, subtask_count）"""
+    title = issue['title']
+
+    cmd = ['gh', 'issue', 'create', '--title', title, '--body', issue['body']]
+    if issue['labels']:
+        cmd.extend(['--label', ','.join(issue['labels'])])
 
     try:
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        sub_count = len(task['subtasks'])
+        sub_count = issue['subtask_count']
         suffix = f"（サブタスク {sub_count}件）" if sub_count > 0 else ""
         print(f"  ✅ 新規作成: {title}{suffix}")
         return result.stdout.strip()
@@ -179,8 +120,7 @@ def create_issue(task):
         return None
 
 
-def update_issue(issue_number, task):
-    new_body = build_issue_body(task)
+def update_issue(issue_number, new_body):
     try:
         subprocess.run(
             ['gh', 'issue', 'edit', str(issue_number), '--body', new_body],
@@ -204,71 +144,146 @@ def close_issue(issue_number, title):
         return False
 
 
+def plan_push(tasks, existing_issues, project_items):
+    """TODO.mdのタスクとリモートの状態から変更操作のリストを作る
+
+    本文・ステータスが既に一致しているIssueには操作を作らない。
+    """
+    existing_map = {issue['title']: issue for issue in existing_issues}
+    project_map = {item['title']: item for item in project_items}
+    operations = []
+
+    for task in tasks:
+        title = task['title']
+        body = build_issue_body(task)
+
+        if title not in existing_map:
+            operations.append({
+                'op': 'create_issue',
+                'title': title,
+                'body': body,
+                'labels': build_labels(task),
+                'subtask_count': len(task['subtasks']),
+            })
+            continue
+
+        issue_number = existing_map[title]['number']
+        all_done = (
+            task['completed']
+            or (task['children'] and task['progress']['done'] == task['progress']['total'])
+        )
+        target_status = "Done" if all_done else derive_project_status(task)
+
+        if existing_map[title].get('body') != body:
+            operations.append({
+                'op': 'update_issue',
+                'number': issue_number,
+                'title': title,
+                'body': body,
+            })
+        if all_done:
+            operations.append({
+                'op': 'close_issue',
+                'number': issue_number,
+                'title': title,
+            })
+        if title in project_map:
+            current = project_map[title].get('status', '')
+            if current != target_status:
+                operations.append({
+                    'op': 'set_project_status',
+                    'item_id': project_map[title]['id'],
+                    'number': issue_number,
+                    'title': title,
+                    'from': current,
+                    'to': target_status,
+                })
+
+    return operations
+
+
+def apply_push_plan(operations):
+    """計画された操作を順に実行し、(新規, 更新, 完了) の件数を返す"""
+    project_id = None
+    if any(op['op'] == 'set_project_status' for op in operations):
+        project_id = get_project_id()
+
+    new_count = 0
+    closed = set()
+    updated = set()
+
+    for op in operations:
+        name = op['op']
+        if name == 'create_issue':
+            create_issue({'title': op['title'], 'body': op['body'], 'labels': op['labels'],
+                          'subtask_count': op['subtask_count']})
+            new_count += 1
+        elif name == 'update_issue':
+            if update_issue(op['number'], op['body']):
+                updated.add(op['number'])
+                print(f"  🔄 #{op['number']} {op['title']}")
+        elif name == 'close_issue':
+            if close_issue(op['number'], op['title']):
+                closed.add(op['number'])
+                print(f"  🎉 #{op['number']} {op['title']} → Done")
+        elif name == 'set_project_status':
+            if update_project_item_status(op['item_id'], op['to'], project_id):
+                updated.add(op['number'])
+                print(f"  📊 #{op['number']} {op['title']}: {op['from']} → {op['to']}")
+
+    return new_count, len(updated - closed), len(closed)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TODO.md → GitHub Issues + Project への同期（push）")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--plan', nargs='?', const=DEFAULT_PLAN_FILE, metavar='FILE',
+                       help=f"変更を実行せず計画とAPIコスト見積もりを保存（既定: カレントディレクトリの {DEFAULT_PLAN_FILE}）")
+    group.add_argument('--apply', metavar='FILE',
+                       help="保存した計画を再取得なしで実行（相対パスはカレントディレクトリ基準）")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     script_dir = Path(__file__).parent
     repo_dir = script_dir.parent
-    todo_file = repo_dir / 'TODO.md'
+    todo_files = get_todo_files(repo_dir)
 
-    if not todo_file.exists():
-        print(f"❌ TODO.mdが見つかりません: {todo_file}")
+    if not todo_files:
+        print(f"❌ TODO.md / TODO.d/*.md が見つかりません: {repo_dir}")
         return
 
     print("⬆️  push: TODO.md → GitHub Issues + Project + git")
     print("=" * 60)
 
-    tasks = parse_todo_file(todo_file)
-    if not tasks:
-        print("タスクが見つかりませんでした。")
-        return
-
-    total_subtasks = sum(len(t['subtasks']) for t in tasks)
-    print(f"📝 {len(tasks)} 件（サブタスク計 {total_subtasks} 件）\n")
-
-    existing_issues = get_existing_issues()
-    existing_map = {issue['title']: issue for issue in existing_issues}
-
-    project_items = get_project_items()
-    project_map = {item['title']: item for item in project_items}
-
-    new_count = 0
-    update_count = 0
-    close_count = 0
-
-    for task in tasks:
-        title = task['title']
-        target_status = derive_project_status(task)
-
-        if title in existing_map:
-            issue = existing_map[title]
-            issue_number = issue['number']
-
-            all_done = (
-                task['completed']
-                or (task['subtasks'] and all(s['completed'] for s in task['subtasks']))
-            )
-
-            if all_done:
-                update_issue(issue_number, task)
-                close_issue(issue_number, title)
-                if title in project_map:
-                    update_project_item_status(project_map[title]['id'], "Done")
-                print(f"  🎉 #{issue_number} {title} → Done")
-                close_count += 1
-            else:
-                update_issue(issue_number, task)
-                if title in project_map:
-                    current = project_map[title].get('status', '')
-                    if current != target_status:
-                        update_project_item_status(project_map[title]['id'], target_status)
-                        print(f"  📊 #{issue_number} {title}: {current} → {target_status}")
-                    else:
-                        print(f"  🔄 #{issue_number} {title} [{target_status}]")
-                else:
-                    print(f"  🔄 #{issue_number} {title}")
-                update_count += 1
-        else:
-            create_issue(task)
-            new_count += 1
+    if args.apply:
+        plan = load_plan(Path(args.apply), 'push')
+        if not plan:
+            return
+        warn_if_stale(plan, todo_files)
+        operations = plan['operations']
+        print(f"📂 計画を実行: {args.apply}（{len(operations)} 操作）\n")
+    else:
+        tasks = load_todo_tasks(repo_dir, parse_todo_file, todo_files)
+        if not tasks:
+            print("タスクが見つかりませんでした。")
+            return
+
+        total_subtasks = sum(len(t['subtasks']) for t in tasks)
+        print(f"📝 {len(tasks)} 件（サブタスク計 {total_subtasks} 件）\n")
+
+        existing_issues = get_existing_issues()
+        project_items = get_project_items()
+        operations = plan_push(tasks, existing_issues, project_items)
+
+        if args.plan:
+            plan = make_plan('push', operations, todo_files)
+            print_plan(plan)
+            save_plan(plan, Path(args.plan))
+            return
+
+    new_count, update_count, close_count = apply_push_plan(operations)
 
     # git commit + push
     git_commit_todo(repo_dir, "タスク同期: push to GitHub")
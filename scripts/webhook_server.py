@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+GitHub Webhook → TODO.md へのイベント駆動同期（pull）
+
+- issues / projects_v2_item イベントを受信して署名を検証
+- イベントはワーカースレッドで処理し、HTTPにはすぐ 202 を返す
+- イベントごとに該当タスクの行だけを更新（sync_from_issues と同じ更新ロジック）
+- Projectアイテム → タイトル / Issue状態 の対応はキャッシュし、未知のアイテムのときだけ取り直す
+- 短時間に連続したイベントはまとめて1コミットにする
+
+環境変数:
+  TODO_WEBHOOK_SECRET    Webhookのシークレット（必須）
+  TODO_WEBHOOK_PORT      待ち受けポート（既定: 8787）
+  TODO_WEBHOOK_DEBOUNCE  最後のイベントからコミットまでの待ち秒数（既定: 10）
+
+ローカルでの動作確認:
+  記録したペイロードを X-GitHub-Event / X-Hub-Signature-256 ヘッダ付きで
+  http://127.0.0.1:8787/ にPOSTする。
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import queue
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from project_config import (
+    STATUS_FIELD_ID, get_project_items, get_todo_files, git_commit_todo
+)
+from sync_from_issues import (
+    ISSUE_CACHE_FILE, apply_issue_updates, get_issues, parse_issue_checkboxes,
+    load_issue_cache, save_issue_cache
+)
+
+DEFAULT_PORT = 8787
+DEFAULT_DEBOUNCE = 10.0
+
+
+def verify_signature(secret, body, signature_header):
+    """X-Hub-Signature-256 ヘッダを検証"""
+    if not secret or not signature_header:
+        return False
+    if not signature_header.startswith('sha256='):
+        return False
+    expected = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header[len('sha256='):])
+
+
+def issue_event_to_update(payload):
+    """issues イベントから (issue_map, project_status_map) を作る"""
+    issue = payload.get('issue')
+    if not issue or 'pull_request' in issue:
+        return None
+
+    entry = {
+        'number': issue['number'],
+        'title': issue['title'],
+        'state': issue.get('state', 'open').upper(),
+        'updatedAt': issue.get('updated_at'),
+        'subtasks': parse_issue_checkboxes(issue.get('body') or ''),
+    }
+    return {entry['title']: entry}, {}
+
+
+def project_item_event_to_update(payload, resolve_item):
+    """projects_v2_item イベントから (issue_map, project_status_map) を作る
+
+    ペイロードにはタイトルもIssueの状態も含まれないため、
+    resolve_item(アイテムのnode_id) → (タイトル, Issue状態, ステータス) で引く。
+    対象はステータスフィールドの edited と created のみ。
+    reordered / archived / restored / converted などは無視する。
+    """
+    item = payload.get('projects_v2_item') or {}
+    if item.get('content_type') not in (None, 'Issue'):
+        return None
+
+    action = payload.get('action')
+    field_value = (payload.get('changes') or {}).get('field_value') or {}
+    if action == 'edited':
+        if field_value.get('field_node_id') != STATUS_FIELD_ID:
+            return None
+    elif action != 'created':
+        return None
+
+    resolved = resolve_item(item.get('node_id'))
+    if not resolved:
+        return None
+    title, state, current_status = resolved
+    if not state:
+        # Issueの状態が分からなければマークを変えない（pullと食い違わないように）
+        return None
+
+    to = field_value.get('to') or {}
+    status = to.get('name') or current_status or 'Todo'
+
+    # ステータスのみ反映する（サブタスクは空 = 変更なし）
+    # CLOSED なら apply_issue_updates の規則どおり [x] のまま
+    entry = {'title': title, 'state': state, 'subtasks': {}}
+    return {title: entry}, {title: status}
+
+
+class TodoWebhookReceiver:
+    """イベントをTODO.mdに反映し、一定時間静かになったらまとめてコミットする"""
+
+    def __init__(self, repo_dir, debounce=DEFAULT_DEBOUNCE, push=True):
+        self.repo_dir = Path(repo_dir)
+        self.cache_path = self.repo_dir / ISSUE_CACHE_FILE
+        self.debounce = debounce
+        self.push = push
+        self.pending_changes = []
+        self.pending_files = set()
+        self._lock = threading.Lock()
+        self._timer = None
+        # Projectアイテム node_id → (タイトル, ステータス)、タイトル → Issue状態
+        self._items = {}
+        self._issue_states = {}
+        self._queue = queue.Queue()
+        self._worker = None
+
+    def start(self):
+        """イベント処理用のワーカースレッドを開始"""
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def enqueue(self, event, payload):
+        """受信したイベントを処理待ちに積む（HTTPの応答はすぐ返す）"""
+        self._queue.put((event, payload))
+
+    def stop(self):
+        """積まれたイベントを処理し終えてからワーカーを止める"""
+        if self._worker:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self.handle_event(*item)
+            except Exception as e:
+                print(f"⚠️  イベント処理に失敗: {item[0]} - {e}", flush=True)
+
+    def resolve_item(self, node_id):
+        """Projectアイテムの (タイトル, Issue状態, ステータス) を返す
+
+        キャッシュにないアイテムのときだけ一覧を取り直す。
+        """
+        if node_id not in self._items:
+            self.refresh_items()
+        if node_id not in self._items:
+            return None
+        title, status = self._items[node_id]
+        return title, self._issue_states.get(title), status
+
+    def refresh_items(self):
+        """Projectアイテム一覧とIssueの状態を取り直してキャッシュする"""
+        self._items = {
+            item['id']: (item.get('title'), item.get('status'))
+            for item in get_project_items() if item.get('id')
+        }
+        self._issue_states.update({i['title']: i['state'] for i in get_issues()})
+
+    def handle_event(self, event, payload):
+        """1イベントを反映し、変更内容のリストを返す"""
+        if event == 'issues':
+            update = issue_event_to_update(payload)
+            if update:
+                for entry in update[0].values():
+                    self._issue_states[entry['title']] = entry['state']
+        elif event == 'projects_v2_item':
+            update = project_item_event_to_update(payload, self.resolve_item)
+            if update:
+                # 以後のイベントが古いステータスを使わないようキャッシュも更新
+                node_id = payload['projects_v2_item'].get('node_id')
+                for title, status in update[1].items():
+                    self._items[node_id] = (title, status)
+        else:
+            return []
+        if not update:
+            return []
+
+        issue_map, project_status_map = update
+        changes = []
+        with self._lock:
+            for todo_path in get_todo_files(self.repo_dir):
+                with open(todo_path, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+                new_lines, file_changes = apply_issue_updates(lines, issue_map, project_status_map)
+                if file_changes:
+                    # 変更のあったファイルだけ書き戻す
+                    with open(todo_path, 'w', encoding='utf-8') as f:
+                        f.writelines(new_lines)
+                    self.pending_files.add(todo_path)
+                    changes.extend(file_changes)
+
+            if changes:
+                self.pending_changes.extend(changes)
+                self._schedule_commit()
+
+            if event == 'issues':
+                self._update_issue_cache(issue_map)
+
+        for c in changes:
+            print(c)
+        return changes
+
+    def _update_issue_cache(self, issue_map):
+        """次回のpullで本文を再取得しないようキャッシュも更新"""
+        cache = load_issue_cache(self.cache_path)
+        for entry in issue_map.values():
+            cache[str(entry['number'])] = {
+                'updatedAt': entry['updatedAt'],
+                'subtasks': entry['subtasks'],
+            }
+        save_issue_cache(self.cache_path, cache)
+
+    def _schedule_commit(self):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.debounce, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """溜まった変更を1コミットにまとめる"""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            count = len(self.pending_changes)
+            files = sorted(self.pending_files)
+            self.pending_changes = []
+            self.pending_files = set()
+            if not count:
+                return False
+
+            committed = git_commit_todo(self.repo_dir, f"タスク同期: webhook ({count}件)", files)
+            if committed and self.push:
+                subprocess.run(
+                    ['git', 'push'],
+                    capture_output=True, text=True, cwd=str(self.repo_dir)
+                )
+            return committed
+
+
+def make_handler(receiver, secret):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length)
+
+            if not verify_signature(secret, body, self.headers.get('X-Hub-Signature-256')):
+                self._respond(401, {'error': 'invalid signature'})
+                return
+
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self._respond(400, {'error': 'invalid json'})
+                return
+
+            event = self.headers.get('X-GitHub-Event', '')
+            if event == 'ping':
+                self._respond(200, {'ok': True})
+                return
+
+            # GitHubの配信タイムアウト（約10秒）に間に合うよう、処理はワーカーで行う
+            receiver.enqueue(event, payload)
+            self._respond(202, {'ok': True, 'queued': event})
+
+        def _respond(self, code, data):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return WebhookHandler
+
+
+def main():
+    script_dir = Path(__file__).parent
+    repo_dir = script_dir.parent
+
+    if not get_todo_files(repo_dir):
+        print(f"❌ TODO.md / TODO.d/*.md が見つかりません: {repo_dir}")
+        return
+
+    secret = os.environ.get('TODO_WEBHOOK_SECRET')
+    if not secret:
+        print("❌ TODO_WEBHOOK_SECRET が設定されていません")
+        return
+
+    port = int(os.environ.get('TODO_WEBHOOK_PORT', DEFAULT_PORT))
+    debounce = float(os.environ.get('TODO_WEBHOOK_DEBOUNCE', DEFAULT_DEBOUNCE))
+
+    receiver = TodoWebhookReceiver(repo_dir, debounce=debounce)
+    receiver.refresh_items()
+    receiver.start()
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(receiver, secret))
+
+    print("📡 webhook: GitHub Issues + Project → TODO.md + git")
+    print("=" * 60)
+    print(f"🔌 http://127.0.0.1:{port}/ で待ち受け中（Ctrl+Cで終了）")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        receiver.stop()
+        receiver.flush()
+        print("\n👋 終了")
+
+
+if __name__ == '__main__':
+    main()